@@ -3,25 +3,70 @@ Prompt Generator API
 Production-ready FastAPI backend for generating and optimizing prompts
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional, Literal
+from fastapi.responses import Response
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional, Literal, Tuple
 from enum import Enum
-import random
+import asyncio
+import json
+import os
 import re
-from dataclasses import dataclass
+import secrets
+import sys
+import threading
+import numpy as np
+from dataclasses import dataclass, field
+from functools import lru_cache
+from contextlib import asynccontextmanager
+
+def _keyword_pattern(keywords: Tuple[str, ...]) -> re.Pattern:
+    """Compile a substring alternation over lowercase keywords, for searching lowercased text"""
+    return re.compile("(" + "|".join(re.escape(kw) for kw in keywords) + ")")
+
+def _shuffled_rows(rng: np.random.Generator, rows: int, n: int) -> np.ndarray:
+    """Return a (rows, n) index matrix whose rows are independent permutations of range(n)"""
+    return rng.permuted(np.broadcast_to(np.arange(n), (rows, n)), axis=1)
+
+_rng_local = threading.local()
+
+def _rng() -> np.random.Generator:
+    """Return this thread's numpy Generator, creating it on first use"""
+    rng = getattr(_rng_local, "rng", None)
+    if rng is None:
+        rng = _rng_local.rng = np.random.default_rng()
+    return rng
+
+def _pick(options, roll: float):
+    """Choose an element using a pre-drawn uniform sample in [0, 1)"""
+    return options[int(roll * len(options))]
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the /generate batcher for the lifetime of the app"""
+    generate_batcher.start()
+    try:
+        yield
+    finally:
+        await generate_batcher.stop()
 
 app = FastAPI(
     title="Prompt Generator API",
     description="Generate and optimize prompts for images, workflows, code, and automation",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
-# CORS configuration for frontend
+# CORS configuration for frontend; set CORS_ORIGINS to a comma-separated list in production.
+# Defaults to the docker-compose frontend so local development works out of the box
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # In production, specify actual domains
+    allow_origins=[
+        origin.strip()
+        for origin in os.environ.get("CORS_ORIGINS", "http://localhost:3000").split(",")
+        if origin.strip()
+    ],
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -42,11 +87,15 @@ class SpecificityLevel(str, Enum):
     EXTREME = "extreme"
 
 class GenerateRequest(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
     prompt_type: PromptTypeEnum
     count: int = Field(default=10, ge=1, le=1000, description="Number of prompts to generate")
     specificity: SpecificityLevel = Field(default=SpecificityLevel.MEDIUM)
 
 class OptimizeRequest(BaseModel):
+    model_config = ConfigDict(frozen=True)
+    
     vague_prompt: str = Field(..., min_length=1, max_length=500)
     context: Optional[str] = Field(None, max_length=500)
 
@@ -61,20 +110,107 @@ class OptimizeResponse(BaseModel):
     optimized: str
     detected_type: str
 
+# Generator vocabulary
+_SPECIFICITY_RATIOS = {
+    SpecificityLevel.LOW: 0.2,
+    SpecificityLevel.MEDIUM: 0.5,
+    SpecificityLevel.HIGH: 0.8,
+    SpecificityLevel.EXTREME: 1.0
+}
+
+_IMAGE_SUBJECTS = (
+    "portrait", "landscape", "product shot", "architectural detail",
+    "street photography", "macro photography", "wildlife", "fashion editorial",
+    "food photography", "interior design", "nature scene", "urban exploration"
+)
+
+_IMAGE_ACTIONS = (
+    "showcasing", "highlighting", "emphasizing", "capturing",
+    "depicting", "illustrating", "featuring", "presenting"
+)
+
+_WORKFLOW_TASKS = (
+    "data ingestion", "report generation", "approval routing",
+    "notification dispatch", "backup process", "sync operation",
+    "data validation", "record processing", "file transformation"
+)
+
+_CODE_LANGUAGES = ("Python", "JavaScript", "TypeScript", "Go", "Rust", "Java")
+
+_CODE_FUNCTIONALITY = (
+    "parses CSV files", "makes HTTP requests", "processes queue messages",
+    "validates user input", "generates reports", "manages database connections",
+    "handles file uploads", "implements caching", "processes webhooks"
+)
+
+# Optimizer vocabulary
+_TYPE_KEYWORDS = (
+    (PromptTypeEnum.IMAGE, ("photo", "image", "picture", "hair", "face", "look", "style", "portrait", "background")),
+    (PromptTypeEnum.WORKFLOW, ("workflow", "process", "pipeline", "approval", "automate")),
+    (PromptTypeEnum.CODE, ("code", "function", "script", "program", "write", "implement", "algorithm")),
+)
+
+_ACTION_KEYWORDS = ("give", "make", "create", "change", "modify", "show", "generate", "build")
+
+_TARGET_KEYWORDS = ("hair", "hairstyle", "haircut", "photo", "image", "code", "workflow", "background")
+
+_HAIR_STYLE_MAP = {
+    "bowl cut": "a classic bowl cut: straight, even fringe across the forehead, rounded silhouette around the head, clean and symmetrical",
+    "pixie": "a modern pixie cut: short on sides and back, slightly longer on top, textured and layered",
+    "bob": "a sleek bob: chin-length, blunt cut, straight and polished",
+    "mullet": "a mullet: short in front and on top, long in the back, with clear distinction between lengths",
+    "undercut": "an undercut: shaved or very short sides and back, longer hair on top with clear contrast",
+    "fade": "a fade: gradual transition from short to longer hair, clean taper on sides and back",
+    "buzz": "a buzz cut: uniform short length all around, clean and low-maintenance",
+    "crew cut": "a crew cut: short on sides, slightly longer on top, classic military style"
+}
+
 # Core Generator Engine
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PromptTemplate:
     type: str
     base_structure: str
-    modifiers: List[str]
-    constraints: List[str]
-    quality_tokens: List[str]
+    modifiers: Tuple[str, ...]
+    constraints: Tuple[str, ...]
+    quality_tokens: Tuple[str, ...]
+    n_modifiers: int = field(init=False, repr=False, compare=False)
+    n_constraints: int = field(init=False, repr=False, compare=False)
+    n_quality: int = field(init=False, repr=False, compare=False)
+    quality_count: int = field(init=False, repr=False, compare=False)
+    _modifiers_arr: np.ndarray = field(init=False, repr=False, compare=False)
+    _constraints_arr: np.ndarray = field(init=False, repr=False, compare=False)
+    _quality_arr: np.ndarray = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        # Frozen, so derived values are written with object.__setattr__
+        # Intern components so tokens shared across templates are stored once and hash/compare by identity
+        modifiers = tuple(sys.intern(s) for s in self.modifiers)
+        constraints = tuple(sys.intern(s) for s in self.constraints)
+        quality_tokens = tuple(sys.intern(s) for s in self.quality_tokens)
+        object.__setattr__(self, "modifiers", modifiers)
+        object.__setattr__(self, "constraints", constraints)
+        object.__setattr__(self, "quality_tokens", quality_tokens)
+        
+        # Sizes are fixed per template, so generate() never recomputes them per batch
+        object.__setattr__(self, "n_modifiers", len(modifiers))
+        object.__setattr__(self, "n_constraints", len(constraints))
+        object.__setattr__(self, "n_quality", len(quality_tokens))
+        object.__setattr__(self, "quality_count", max(1, int(len(quality_tokens) * 0.4)))
+        
+        # Object arrays let generate() gather sampled components for a whole batch with one fancy index
+        object.__setattr__(self, "_modifiers_arr", np.array(modifiers, dtype=object))
+        object.__setattr__(self, "_constraints_arr", np.array(constraints, dtype=object))
+        object.__setattr__(self, "_quality_arr", np.array(quality_tokens, dtype=object))
 
 class PromptGeneratorEngine:
     """Core engine for prompt generation and optimization"""
     
     def __init__(self):
         self.templates = self._init_templates()
+        # Longest styles first so multi-word names win over any shorter overlapping name
+        self._hair_style_pattern = _keyword_pattern(tuple(sorted(_HAIR_STYLE_MAP, key=len, reverse=True)))
+        # Optimization is deterministic for a given input; inputs are length-capped so the cache is bounded
+        self._optimize_cached = lru_cache(maxsize=4096)(self._optimize_uncached)
     
     def _init_templates(self):
         """Initialize prompt templates for different types"""
@@ -83,12 +219,12 @@ class PromptGeneratorEngine:
                 PromptTemplate(
                     type="image",
                     base_structure="{subject} {action} {style} {technical}",
-                    modifiers=[
+                    modifiers=(
                         "photorealistic", "artistic", "abstract", "hyper-detailed",
                         "minimalist", "dramatic", "cinematic", "editorial",
                         "vibrant", "muted tones", "high contrast", "soft lighting"
-                    ],
-                    constraints=[
+                    ),
+                    constraints=(
                         "maintain exact facial features and proportions",
                         "preserve original identity and likeness",
                         "keep consistent lighting and shadows",
@@ -97,24 +233,24 @@ class PromptGeneratorEngine:
                         "avoid distortion or warping",
                         "maintain background integrity",
                         "preserve skin texture and tone"
-                    ],
-                    quality_tokens=[
+                    ),
+                    quality_tokens=(
                         "8k resolution", "professional photography", "studio lighting",
                         "bokeh", "shallow depth of field", "golden hour",
                         "sharp focus", "HDR", "award-winning", "magazine quality"
-                    ]
+                    )
                 )
             ],
             PromptTypeEnum.WORKFLOW: [
                 PromptTemplate(
                     type="workflow",
                     base_structure="Create a {workflow_type} that {action} with {requirements}",
-                    modifiers=[
+                    modifiers=(
                         "automated pipeline", "approval process", "data transformation",
                         "notification system", "scheduled task", "event-driven workflow",
                         "multi-stage process", "conditional routing", "parallel execution"
-                    ],
-                    constraints=[
+                    ),
+                    constraints=(
                         "error handling for each step",
                         "rollback mechanism on failure",
                         "logging and audit trail",
@@ -123,23 +259,23 @@ class PromptGeneratorEngine:
                         "retry logic with exponential backoff",
                         "state persistence",
                         "concurrency control"
-                    ],
-                    quality_tokens=[
+                    ),
+                    quality_tokens=(
                         "production-ready", "scalable", "maintainable",
                         "well-documented", "testable", "monitored", "resilient"
-                    ]
+                    )
                 )
             ],
             PromptTypeEnum.AUTOMATION: [
                 PromptTemplate(
                     type="automation",
                     base_structure="Automate {task} that {condition} and {output}",
-                    modifiers=[
+                    modifiers=(
                         "triggers when", "runs daily at", "monitors continuously",
                         "responds to events", "processes batch", "streams data",
                         "executes on schedule", "reacts to changes"
-                    ],
-                    constraints=[
+                    ),
+                    constraints=(
                         "handle edge cases and null values",
                         "validate input data",
                         "graceful degradation",
@@ -148,23 +284,23 @@ class PromptGeneratorEngine:
                         "data consistency guarantees",
                         "transaction management",
                         "resource cleanup"
-                    ],
-                    quality_tokens=[
+                    ),
+                    quality_tokens=(
                         "reliable", "fault-tolerant", "observable",
                         "recoverable", "performant", "secure"
-                    ]
+                    )
                 )
             ],
             PromptTypeEnum.CODE: [
                 PromptTemplate(
                     type="code",
                     base_structure="Write {language} code that {functionality} with {requirements}",
-                    modifiers=[
+                    modifiers=(
                         "class implementation", "API endpoint", "data processor",
                         "utility function", "CLI tool", "background service",
                         "database layer", "service integration", "message handler"
-                    ],
-                    constraints=[
+                    ),
+                    constraints=(
                         "type hints/annotations",
                         "error handling with specific exceptions",
                         "input validation",
@@ -173,11 +309,11 @@ class PromptGeneratorEngine:
                         "no hardcoded values",
                         "configuration externalized",
                         "logging instrumentation"
-                    ],
-                    quality_tokens=[
+                    ),
+                    quality_tokens=(
                         "production-grade", "efficient", "readable",
                         "maintainable", "well-tested", "documented", "SOLID principles"
-                    ]
+                    )
                 )
             ]
         }
@@ -189,186 +325,163 @@ class PromptGeneratorEngine:
             raise ValueError(f"No templates for {prompt_type}")
         
         prompts = []
-        specificity_levels = {
-            SpecificityLevel.LOW: 0.2,
-            SpecificityLevel.MEDIUM: 0.5,
-            SpecificityLevel.HIGH: 0.8,
-            SpecificityLevel.EXTREME: 1.0
-        }
-        
-        constraint_ratio = specificity_levels[specificity]
-        
-        for _ in range(count):
-            template = random.choice(templates)
+        constraint_ratio = _SPECIFICITY_RATIOS[specificity]
+        
+        # Draw every random number for the batch up front instead of per prompt
+        rng = _rng()
+        template_picks = (rng.random(count) * len(templates)).astype(np.intp).tolist()
+        modifier_scales = rng.uniform(0.3, 0.7, count)
+        quality_rolls = (rng.random(count) < constraint_ratio).tolist()
+        choice_rolls = rng.random((count, 3)).tolist()
+        
+        # Per template: modifier counts per row and the sampled components for every row,
+        # gathered from per-row Fisher-Yates shuffles in one fancy index each
+        draws = []
+        for template in templates:
+            num_constraints = int(template.n_constraints * constraint_ratio)
+            draws.append((
+                np.maximum(1, (template.n_modifiers * constraint_ratio * modifier_scales).astype(np.intp)).tolist(),
+                template._modifiers_arr[_shuffled_rows(rng, count, template.n_modifiers)].tolist(),
+                template._constraints_arr[_shuffled_rows(rng, count, template.n_constraints)[:, :num_constraints]].tolist(),
+                template._quality_arr[_shuffled_rows(rng, count, template.n_quality)[:, :template.quality_count]].tolist(),
+            ))
+        
+        for row in range(count):
+            template = templates[template_picks[row]]
+            num_modifiers, modifiers, constraints, quality = draws[template_picks[row]]
             
             # Select components based on specificity
-            num_modifiers = max(1, int(len(template.modifiers) * constraint_ratio * random.uniform(0.3, 0.7)))
-            selected_modifiers = random.sample(template.modifiers, num_modifiers)
-            
-            num_constraints = int(len(template.constraints) * constraint_ratio)
-            selected_constraints = random.sample(template.constraints, num_constraints) if num_constraints > 0 else []
-            
-            if random.random() < constraint_ratio:
-                num_quality = max(1, int(len(template.quality_tokens) * 0.4))
-                selected_quality = random.sample(template.quality_tokens, num_quality)
-            else:
-                selected_quality = []
+            selected_modifiers = modifiers[row][:num_modifiers[row]]
+            selected_constraints = constraints[row]
+            selected_quality = quality[row] if quality_rolls[row] else []
             
             # Assemble prompt based on type
             if prompt_type == PromptTypeEnum.IMAGE:
-                prompt = self._assemble_image_prompt(selected_modifiers, selected_constraints, selected_quality)
+                prompt = self._assemble_image_prompt(selected_modifiers, selected_constraints, selected_quality, choice_rolls[row])
             elif prompt_type in [PromptTypeEnum.WORKFLOW, PromptTypeEnum.AUTOMATION]:
-                prompt = self._assemble_workflow_prompt(template, selected_modifiers, selected_constraints, selected_quality)
+                prompt = self._assemble_workflow_prompt(template, selected_modifiers, selected_constraints, selected_quality, choice_rolls[row])
             else:
-                prompt = self._assemble_code_prompt(template, selected_modifiers, selected_constraints, selected_quality)
+                prompt = self._assemble_code_prompt(template, selected_modifiers, selected_constraints, selected_quality, choice_rolls[row])
             
             prompts.append(prompt)
         
         return prompts
     
-    def _assemble_image_prompt(self, modifiers, constraints, quality):
+    def _assemble_image_prompt(self, modifiers, constraints, quality, rolls):
         """Assemble image generation prompt"""
-        subjects = [
-            "portrait", "landscape", "product shot", "architectural detail",
-            "street photography", "macro photography", "wildlife", "fashion editorial",
-            "food photography", "interior design", "nature scene", "urban exploration"
-        ]
-        
-        actions = [
-            "showcasing", "highlighting", "emphasizing", "capturing",
-            "depicting", "illustrating", "featuring", "presenting"
-        ]
-        
-        subject = random.choice(subjects)
-        action = random.choice(actions)
+        subject = _pick(_IMAGE_SUBJECTS, rolls[0])
+        action = _pick(_IMAGE_ACTIONS, rolls[1])
         style = ", ".join(modifiers[:2]) if len(modifiers) >= 2 else modifiers[0] if modifiers else "realistic"
         
-        prompt = f"{style.capitalize()} {subject} {action} the subject"
+        segments = [f"{style.capitalize()} {subject} {action} the subject"]
         
         if constraints:
-            prompt += f". Must preserve: {', '.join(constraints[:3])}"
+            segments.append(f"Must preserve: {', '.join(constraints[:3])}")
         
         if quality:
-            prompt += f". Quality requirements: {', '.join(quality)}"
+            segments.append(f"Quality requirements: {', '.join(quality)}")
         
-        return prompt
+        return ". ".join(segments)
     
-    def _assemble_workflow_prompt(self, template, modifiers, constraints, quality):
+    def _assemble_workflow_prompt(self, template, modifiers, constraints, quality, rolls):
         """Assemble workflow/automation prompt"""
-        tasks = [
-            "data ingestion", "report generation", "approval routing",
-            "notification dispatch", "backup process", "sync operation",
-            "data validation", "record processing", "file transformation"
-        ]
-        
-        task = random.choice(tasks)
-        condition = random.choice(modifiers) if modifiers else "on trigger"
+        task = _pick(_WORKFLOW_TASKS, rolls[0])
+        condition = _pick(modifiers, rolls[1]) if modifiers else "on trigger"
         
-        prompt = f"Create {task} workflow that {condition}"
+        segments = [f"Create {task} workflow that {condition}"]
         
         if constraints:
-            prompt += f". Requirements: {', '.join(constraints[:4])}"
+            segments.append(f"Requirements: {', '.join(constraints[:4])}")
         
         if quality:
-            prompt += f". Standards: {', '.join(quality)}"
+            segments.append(f"Standards: {', '.join(quality)}")
         
-        return prompt
+        return ". ".join(segments)
     
-    def _assemble_code_prompt(self, template, modifiers, constraints, quality):
+    def _assemble_code_prompt(self, template, modifiers, constraints, quality, rolls):
         """Assemble code generation prompt"""
-        languages = ["Python", "JavaScript", "TypeScript", "Go", "Rust", "Java"]
-        functionality = [
-            "parses CSV files", "makes HTTP requests", "processes queue messages",
-            "validates user input", "generates reports", "manages database connections",
-            "handles file uploads", "implements caching", "processes webhooks"
-        ]
+        lang = _pick(_CODE_LANGUAGES, rolls[0])
+        func = _pick(_CODE_FUNCTIONALITY, rolls[1])
+        modifier = _pick(modifiers, rolls[2]) if modifiers else "function"
         
-        lang = random.choice(languages)
-        func = random.choice(functionality)
-        modifier = random.choice(modifiers) if modifiers else "function"
-        
-        prompt = f"Write {lang} {modifier} that {func}"
+        segments = [f"Write {lang} {modifier} that {func}"]
         
         if constraints:
-            prompt += f". Must include: {', '.join(constraints[:4])}"
+            segments.append(f"Must include: {', '.join(constraints[:4])}")
         
         if quality:
-            prompt += f". Quality: {', '.join(quality)}"
+            segments.append(f"Quality: {', '.join(quality)}")
         
-        return prompt
+        return ". ".join(segments)
     
     def optimize(self, vague_prompt: str, context: Optional[str] = None) -> tuple[str, str]:
         """Optimize a vague prompt into a specific one"""
-        prompt_type = self._detect_prompt_type(vague_prompt)
+        return self._optimize_cached(vague_prompt, context)
+    
+    def clear_cache(self):
+        """Drop all memoized optimize() results"""
+        self._optimize_cached.cache_clear()
+    
+    def _optimize_uncached(self, vague_prompt: str, context: Optional[str]) -> tuple[str, str]:
+        # Every keyword check below is a substring match against this one lowercased copy
+        vague_lower = vague_prompt.lower()
+        prompt_type = self._detect_prompt_type(vague_lower)
         
-        if context:
-            optimized = f"{context}. "
-        else:
-            optimized = ""
+        parts = [f"{context}. "] if context else []
         
-        intent = self._extract_intent(vague_prompt)
+        intent = self._extract_intent(vague_lower)
         
         if prompt_type == PromptTypeEnum.IMAGE:
-            optimized += self._optimize_image_prompt(vague_prompt, intent)
+            parts.append(self._optimize_image_prompt(vague_lower, intent))
         elif prompt_type == PromptTypeEnum.WORKFLOW:
-            optimized += self._optimize_workflow_prompt(vague_prompt, intent)
+            parts.append(self._optimize_workflow_prompt(vague_prompt, intent))
         elif prompt_type == PromptTypeEnum.CODE:
-            optimized += self._optimize_code_prompt(vague_prompt, intent)
+            parts.append(self._optimize_code_prompt(vague_prompt, intent))
         else:
-            optimized += self._optimize_generic_prompt(vague_prompt, intent)
+            parts.append(self._optimize_generic_prompt(vague_prompt, intent))
         
-        return optimized.strip(), prompt_type.value
+        return "".join(parts).strip(), prompt_type.value
     
-    def _detect_prompt_type(self, prompt: str) -> PromptTypeEnum:
-        """Detect prompt type from content"""
-        prompt_lower = prompt.lower()
-        
-        image_keywords = ["photo", "image", "picture", "hair", "face", "look", "style", "portrait", "background"]
-        workflow_keywords = ["workflow", "process", "pipeline", "approval", "automate"]
-        code_keywords = ["code", "function", "script", "program", "write", "implement", "algorithm"]
-        
-        if any(kw in prompt_lower for kw in image_keywords):
-            return PromptTypeEnum.IMAGE
-        elif any(kw in prompt_lower for kw in workflow_keywords):
-            return PromptTypeEnum.WORKFLOW
-        elif any(kw in prompt_lower for kw in code_keywords):
-            return PromptTypeEnum.CODE
-        else:
-            return PromptTypeEnum.IMAGE
+    def _detect_prompt_type(self, prompt_lower: str) -> PromptTypeEnum:
+        """Detect prompt type from lowercased content"""
+        # Plain `in` scans beat a regex alternation here for prompts capped at 500 chars
+        for prompt_type, keywords in _TYPE_KEYWORDS:
+            for keyword in keywords:
+                if keyword in prompt_lower:
+                    return prompt_type
+        return PromptTypeEnum.IMAGE
     
-    def _extract_intent(self, prompt: str):
-        """Extract user intent from prompt"""
+    def _extract_intent(self, prompt_lower: str):
+        """Extract user intent from a lowercased prompt"""
         return {
-            "action": self._find_action(prompt),
-            "target": self._find_target(prompt)
+            "action": self._find_action(prompt_lower),
+            "target": self._find_target(prompt_lower)
         }
     
-    def _find_action(self, prompt: str):
-        actions = ["give", "make", "create", "change", "modify", "show", "generate", "build"]
-        for action in actions:
-            if action in prompt.lower():
+    def _find_action(self, prompt_lower: str):
+        for action in _ACTION_KEYWORDS:
+            if action in prompt_lower:
                 return action
         return "create"
     
-    def _find_target(self, prompt: str):
-        targets = ["hair", "hairstyle", "haircut", "photo", "image", "code", "workflow", "background"]
-        for target in targets:
-            if target in prompt.lower():
+    def _find_target(self, prompt_lower: str):
+        for target in _TARGET_KEYWORDS:
+            if target in prompt_lower:
                 return target
         return "item"
     
-    def _optimize_image_prompt(self, vague: str, intent):
+    def _optimize_image_prompt(self, vague_lower: str, intent):
         """Optimize image prompts with precision"""
         base = []
         
-        if "photo" in vague.lower() or "image" in vague.lower():
+        if "photo" in vague_lower or "image" in vague_lower:
             base.append("Using the uploaded photo, keep the person or subject's face, identity, and proportions exactly the same")
         
-        if "hair" in vague.lower() or "haircut" in vague.lower():
-            style = self._extract_hair_style(vague)
+        if "hair" in vague_lower:
+            style = self._extract_hair_style(vague_lower)
             base.append(f"Change only their hairstyle to {style}")
             base.append("The haircut should look realistic and naturally blended with the existing hair texture, color, lighting, and head shape")
-        elif "background" in vague.lower():
+        elif "background" in vague_lower:
             base.append("Change only the background while preserving the subject completely")
             base.append("Ensure seamless integration with proper lighting, shadows, and depth matching")
         else:
@@ -378,22 +491,11 @@ class PromptGeneratorEngine:
         
         return ". ".join(base)
     
-    def _extract_hair_style(self, prompt: str):
-        """Extract and describe hair style"""
-        style_map = {
-            "bowl cut": "a classic bowl cut: straight, even fringe across the forehead, rounded silhouette around the head, clean and symmetrical",
-            "pixie": "a modern pixie cut: short on sides and back, slightly longer on top, textured and layered",
-            "bob": "a sleek bob: chin-length, blunt cut, straight and polished",
-            "mullet": "a mullet: short in front and on top, long in the back, with clear distinction between lengths",
-            "undercut": "an undercut: shaved or very short sides and back, longer hair on top with clear contrast",
-            "fade": "a fade: gradual transition from short to longer hair, clean taper on sides and back",
-            "buzz": "a buzz cut: uniform short length all around, clean and low-maintenance",
-            "crew cut": "a crew cut: short on sides, slightly longer on top, classic military style"
-        }
-        
-        for style, description in style_map.items():
-            if style in prompt.lower():
-                return description
+    def _extract_hair_style(self, prompt_lower: str):
+        """Extract and describe hair style from a lowercased prompt"""
+        match = self._hair_style_pattern.search(prompt_lower)
+        if match:
+            return _HAIR_STYLE_MAP[match.group(1)]
         
         return "the requested hairstyle with appropriate length, shape, and styling details"
     
@@ -417,24 +519,152 @@ class PromptGeneratorEngine:
         """Fallback optimizer"""
         return f"Please provide a detailed, specific implementation of: {vague}. Include all necessary constraints, requirements, and quality standards for production use."
 
+# Request batching
+class GenerateBatcher:
+    """Coalesces concurrent generate calls into one engine.generate per (prompt_type, specificity)"""
+    
+    def __init__(self, engine: PromptGeneratorEngine, max_batch_size: int = 32, batch_wait_timeout_s: float = 0.01):
+        self.engine = engine
+        self.max_batch_size = max_batch_size
+        self.batch_wait_timeout_s = batch_wait_timeout_s
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._dispatches: set = set()
+    
+    def start(self):
+        """Start the background batching task on the running event loop"""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        """Cancel the background batching task and any batches still running"""
+        tasks = list(self._dispatches)
+        if self._task is not None:
+            tasks.append(self._task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatches.clear()
+        self._queue = None
+        self._task = None
+    
+    async def submit(self, prompt_type: PromptTypeEnum, count: int, specificity: SpecificityLevel) -> List[str]:
+        """Queue a generate call and wait for its slice of the batched result"""
+        if self._task is None:
+            # Not started (e.g. app run without lifespan events): generate directly
+            return await asyncio.to_thread(self.engine.generate, prompt_type, count, specificity)
+        
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((prompt_type, count, specificity, future))
+        return await future
+    
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_wait_timeout_s
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            
+            groups = {}
+            for prompt_type, count, specificity, future in batch:
+                groups.setdefault((prompt_type, specificity), []).append((count, future))
+            
+            # Dispatch without waiting so a large batch doesn't hold up the ones behind it;
+            # concurrency is bounded by the prompt budget and the default thread pool
+            for (prompt_type, specificity), items in groups.items():
+                task = asyncio.create_task(self._dispatch(prompt_type, specificity, items))
+                self._dispatches.add(task)
+                task.add_done_callback(self._dispatches.discard)
+    
+    async def _dispatch(self, prompt_type: PromptTypeEnum, specificity: SpecificityLevel, items):
+        """Run one combined generate call and hand each caller its slice"""
+        try:
+            prompts = await asyncio.to_thread(
+                self.engine.generate, prompt_type, sum(count for count, _ in items), specificity
+            )
+        except Exception as e:
+            for _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        offset = 0
+        for count, future in items:
+            if not future.done():
+                future.set_result(prompts[offset:offset + count])
+            offset += count
+
+# Load shedding
+class PromptBudget:
+    """Caps the total prompts being generated across in-flight requests on this worker"""
+    
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.in_flight = 0
+    
+    def try_acquire(self, count: int) -> bool:
+        """Reserve count prompts if they fit; only call from the event loop"""
+        if self.in_flight + count > self.capacity:
+            return False
+        self.in_flight += count
+        return True
+    
+    def release(self, count: int):
+        self.in_flight -= count
+
 # Initialize engine
 engine = PromptGeneratorEngine()
+generate_batcher = GenerateBatcher(engine)
+prompt_budget = PromptBudget(int(os.environ.get("MAX_CONCURRENT_PROMPTS", 4000)))
+
+# Admin endpoints are disabled unless a token is configured
+_ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+
+# Constant responses, encoded to JSON once at import
+_ROOT_RESPONSE = json.dumps({
+    "status": "online",
+    "service": "Prompt Generator API",
+    "version": "1.0.0"
+}).encode()
+
+_TYPES_RESPONSE = json.dumps({
+    "types": [t.value for t in PromptTypeEnum],
+    "specificity_levels": [s.value for s in SpecificityLevel]
+}).encode()
 
 # API Endpoints
 @app.get("/")
 async def root():
     """Health check endpoint"""
-    return {
-        "status": "online",
-        "service": "Prompt Generator API",
-        "version": "1.0.0"
-    }
+    return Response(content=_ROOT_RESPONSE, media_type="application/json")
 
-@app.post("/generate", response_model=GenerateResponse)
+# /generate is batched and offloads the combined call to a worker thread; the
+# other CPU-bound endpoints are plain def so Starlette runs them in its threadpool
+@app.post("/generate", response_model=GenerateResponse, response_model_exclude_none=True)
 async def generate_prompts(request: GenerateRequest):
     """Generate multiple random prompts"""
+    if request.count > prompt_budget.capacity:
+        # Retrying can never fit this request, so don't answer 429
+        raise HTTPException(
+            status_code=422,
+            detail=f"count exceeds this server's limit of {prompt_budget.capacity} prompts per request"
+        )
+    if not prompt_budget.try_acquire(request.count):
+        raise HTTPException(
+            status_code=429,
+            detail="Server is at capacity, retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    
     try:
-        prompts = engine.generate(
+        prompts = await generate_batcher.submit(
             prompt_type=request.prompt_type,
             count=request.count,
             specificity=request.specificity
@@ -448,9 +678,11 @@ async def generate_prompts(request: GenerateRequest):
         )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        prompt_budget.release(request.count)
 
-@app.post("/optimize", response_model=OptimizeResponse)
-async def optimize_prompt(request: OptimizeRequest):
+@app.post("/optimize", response_model=OptimizeResponse, response_model_exclude_none=True)
+def optimize_prompt(request: OptimizeRequest):
     """Optimize a vague prompt into a specific one"""
     try:
         optimized, detected_type = engine.optimize(
@@ -469,11 +701,30 @@ async def optimize_prompt(request: OptimizeRequest):
 @app.get("/types")
 async def get_prompt_types():
     """Get available prompt types"""
-    return {
-        "types": [t.value for t in PromptTypeEnum],
-        "specificity_levels": [s.value for s in SpecificityLevel]
-    }
+    return Response(content=_TYPES_RESPONSE, media_type="application/json")
+
+@app.post("/admin/clear-cache")
+async def clear_cache(x_admin_token: Optional[str] = Header(None)):
+    """Clear the optimizer result cache; requires the X-Admin-Token header"""
+    if not _ADMIN_TOKEN or not x_admin_token or not secrets.compare_digest(x_admin_token, _ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    engine.clear_cache()
+    return {"status": "cleared"}
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Each worker is a separate process with its own event loop, threadpool, batcher and prompt
+    # budget, so cap the default: os.cpu_count() reports the host's cores inside containers.
+    # A single worker serves this module's app directly; multiple workers need an import string,
+    # which makes each worker import main itself (this process only supervises them).
+    # "auto" picks uvloop/httptools when installed and falls back to asyncio/h11 otherwise
+    workers = int(os.environ.get("WORKERS", min(os.cpu_count() or 1, 4)))
+    uvicorn.run(
+        app if workers == 1 else "main:app",
+        host="0.0.0.0",
+        port=int(os.environ.get("PORT", 8000)),
+        workers=workers,
+        loop="auto",
+        http="auto",
+        log_level="warning"
+    )